@@ -1,3 +1,4 @@
+import numpy as np
 
 
 
@@ -13,8 +14,15 @@ class Camera:
         self._zoom = zoom
         self._inv_zoom = 1 / zoom
 
+    @property
+    def view(self) -> tuple[vec2, float]:
+        return self._offset, self._zoom
+
     def transform(self, point: vec2) -> vec2:
         return ((point[0] + self._offset[0]) * self._zoom, (point[1] + self._offset[1]) * self._zoom)
+
+    def transform_batch(self, points: np.ndarray) -> np.ndarray:
+        return (points + np.asarray(self._offset)) * self._zoom
     
     def scale(self, value: float) -> float:
         return value * self._inv_zoom
@@ -1,3 +1,4 @@
+import heapq
 import pygame
 
 from typing import Callable
@@ -10,14 +11,19 @@ TimerID = int
 
 
 class EventManager:
-    __slots__ = ('key_pressed', 'button_pressed', 'listeners', 'timers', 'quit', 'mouse_pos', 'mouse_rel')
+    __slots__ = ('key_pressed', 'button_pressed', 'listeners', 'timers', 'time', 'quit', 'mouse_pos', 'mouse_rel', '_next_listener_id', '_next_timer_id')
 
     def __init__(self) -> None:
         self.key_pressed: dict[int, bool] = {}
         self.button_pressed: dict[int, bool] = {}
 
         self.listeners: dict[int, dict[int, Callable[[pygame.Event], None]]] = {}
-        self.timers: dict[int, tuple[float, Callable]] = {}
+        self._next_listener_id = 0
+
+        # heap of (deadline, id, function)
+        self.timers: list[tuple[float, TimerID, Callable]] = []
+        self.time = 0.0
+        self._next_timer_id = 0
 
         self.quit = False
 
@@ -47,26 +53,22 @@ class EventManager:
                     self.mouse_pos = event.pos
                     self.mouse_rel = (self.mouse_rel[0] + event.rel[0], self.mouse_rel[1] + event.rel[1])
 
+            # iterate over a snapshot, as listeners can be added or removed while the event is handled
             if event.type in self.listeners:
                 for listener in list(self.listeners[event.type].values()):
                     listener(event)
 
-        for timer_id, timer in list(self.timers.items()):
-            time_left = timer[0] - dt
-
-            if time_left > 0:
-                self.timers[timer_id] = (time_left, timer[1])
+        self.time += dt
 
-            else:
-                timer[1]()
-                
-                self.remove_timer(timer_id)
+        while self.timers and self.timers[0][0] <= self.time:
+            heapq.heappop(self.timers)[2]()
 
     def add_listener(self, event_type: int, function: Callable[[pygame.Event], None]) -> ListernerID:
         if event_type not in self.listeners:
             self.listeners[event_type] = {}
 
-        i = max(self.listeners[event_type], default=-1) + 1
+        i = self._next_listener_id
+        self._next_listener_id += 1
 
         self.listeners[event_type][i] = function
 
@@ -77,14 +79,16 @@ class EventManager:
             self.listeners[listener_event_type].pop(listener_index)
 
     def add_timer(self, time: float, function: Callable) -> TimerID:
-        i = max(self.timers, default=-1) + 1
+        i = self._next_timer_id
+        self._next_timer_id += 1
 
-        self.timers[i] = (time, function)
+        heapq.heappush(self.timers, (self.time + time, i, function))
 
         return i
 
     def remove_timer(self, timer_id: TimerID) -> None:
-        self.timers.pop(timer_id)
+        self.timers = [timer for timer in self.timers if timer[1] != timer_id]
+        heapq.heapify(self.timers)
 
     def is_key_pressed(self, key: int) -> bool:
         if key in self.key_pressed:
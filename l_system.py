@@ -1,21 +1,49 @@
-import random
+import re
+import numpy as np
+
+from functools import lru_cache
 
 
 
 Rules = dict[str, tuple[tuple[str, ...], tuple[float, ...]] | str]
+RulesKey = tuple[tuple[str, tuple[tuple[str, ...], tuple[float, ...]] | str], ...]
 
 
 
 class LSystem:
-    __slots__ = ('alphabet', 'rules', 'axiom', 'state')
+    __slots__ = ('rules', 'axiom', 'state', 'rng', '_translation', '_stochastic_rules', '_stochastic_pattern')
 
 
-    def __init__(self, alphabet: str, rules: Rules, axiom: str) -> None:
-        self.alphabet = alphabet
+    def __init__(self, rules: Rules, axiom: str, seed: int | None = None) -> None:
         self.rules = rules
         self.axiom = axiom
         self.state = axiom
 
+        deterministic_rules: dict[str, str] = {}
+        self._stochastic_rules: dict[str, tuple[tuple[str, ...], np.ndarray]] = {}
+
+        # split the rules, treating stochastic rules with a single possible outcome as deterministic
+        for symbol, rule in rules.items():
+            if isinstance(rule, str):
+                deterministic_rules[symbol] = rule
+                continue
+
+            population, weights = rule
+            probabilities = np.asarray(weights, float)
+            probabilities /= probabilities.sum()
+
+            outcomes = np.flatnonzero(probabilities)
+
+            if len(outcomes) == 1:
+                deterministic_rules[symbol] = population[outcomes[0]]
+            else:
+                self._stochastic_rules[symbol] = (population, probabilities)
+
+        self._translation = str.maketrans(deterministic_rules)
+        self._stochastic_pattern = re.compile(f'([{"".join(map(re.escape, self._stochastic_rules))}])') if self._stochastic_rules else None
+
+        self.rng = np.random.default_rng(seed)
+
 
     def __repr__(self) -> str:
         return self.state
@@ -26,20 +54,39 @@ class LSystem:
 
 
     def step(self, n: int = 1) -> None:
+        translation = self._translation
+
         for _ in range(n):
-            next_state = ''
+            if self._stochastic_pattern is None:
+                self.state = self.state.translate(translation)
+                continue
+
+            # even indexes hold the text between stochastic symbols, odd indexes the symbols themselves
+            parts = self._stochastic_pattern.split(self.state)
+            parts[::2] = [part.translate(translation) for part in parts[::2]]
+
+            symbols = parts[1::2]
+
+            for symbol, (population, probabilities) in self._stochastic_rules.items():
+                positions = [2 * i + 1 for i, other in enumerate(symbols) if other == symbol]
+
+                if positions:
+                    choices = self.rng.choice(len(population), size=len(positions), p=probabilities)
+
+                    for i, choice in zip(positions, choices.tolist()):
+                        parts[i] = population[choice]
+
+            self.state = ''.join(parts)
+
+
 
-            for symbol in self.state:
-                if symbol in self.rules:
-                    symbol_rule = self.rules[symbol]
+def freeze_rules(rules: Rules) -> RulesKey:
+    return tuple(sorted(rules.items()))
 
-                    if isinstance(symbol_rule, str):
-                        next_state += symbol_rule
-                    else:
-                        population, weights = symbol_rule
-                        next_state += random.choices(population, weights)[0]
-                else:
-                    next_state += symbol
 
-            self.state = next_state
+@lru_cache(maxsize=1024)
+def get_expanded_state(rules_key: RulesKey, axiom: str, n: int, seed: int) -> str:
+    l_system = LSystem(dict(rules_key), axiom, seed)
+    l_system.step(n)
 
+    return l_system.state
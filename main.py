@@ -15,7 +15,7 @@ window = pygame.display.set_mode((1335, 1000))
 clock = pygame.Clock()
 
 event_manager = EventManager()
-ui_manager = UIManager(event_manager)
+ui_manager = UIManager(event_manager, (200, 200, 200))
 
 plant_window = ui.MutationWindow(ui_manager, Plant(Plant.ASPEN_GROWTH_RULES, Plant.ASPEN_AXIOM, Plant.ASPEN_DRAW_SETTINGS))
 
@@ -134,11 +134,11 @@ while running:
     if event_manager.quit or event_manager.is_key_pressed(pygame.K_ESCAPE):
         running = False
 
-    window.fill((200, 200, 200))
+    dirty_rects = ui_manager.render(window)
 
-    ui_manager.render(window)
-
-    pygame.display.flip()
+    # only update the parts of the window that changed
+    if dirty_rects:
+        pygame.display.update(dirty_rects)
 
 
 pygame.quit()
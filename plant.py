@@ -1,14 +1,17 @@
+import re
 import random
 import numpy as np
 import pygame
 
-from typing import Callable, Any
-from functools import partial, lru_cache
+from typing import Callable
+from math import cos, sin, radians
+from functools import lru_cache
+from itertools import accumulate
+from bisect import bisect
 from dataclasses import dataclass
-from queue import LifoQueue
 from camera import Camera, vec2
 from color import get_similar_color, Color
-from l_system import LSystem, Rules
+from l_system import Rules, freeze_rules, get_expanded_state
 
 
 
@@ -50,10 +53,13 @@ class DrawSettings:
 
 _LORAX_TREE_COLORS = ((250, 215, 5), (250, 175, 25), (250, 135, 175), (180, 125, 220))
 
+# runs of moves and turns are handled as single tokens when drawing
+_DRAW_TOKENS = re.compile(r'[Ff]+|\++|-+|[Xx\[\]]')
 
 
-class Plant(LSystem):
-    __slots__ = ('draw_settings', 'length', 'render_funcs')
+
+class Plant:
+    __slots__ = ('rules', 'axiom', 'state', 'draw_settings', 'length', 'seed', 'trunk_points', 'trunk_offsets', 'trunk_widths', 'trunk_colors', 'leaf_centers', 'leaf_angles', 'leaf_colors')
 
     # plant presets
     ASPEN_GROWTH_RULES: Rules = {'X': (('F[---X]+f-F[++++X]-X', 'F[+++X]-F+f[----X]+X'), (0.5, 0.5))}
@@ -117,19 +123,30 @@ class Plant(LSystem):
     )
 
 
-    def __init__(self, growth_rules: Rules, axiom: str, draw_settings: DrawSettings, length: float = 1.5) -> None: 
-        super().__init__('FfXx[]+-', self.get_length_rule(length) | growth_rules, axiom)
+    def __init__(self, growth_rules: Rules, axiom: str, draw_settings: DrawSettings, length: float = 1.5, seed: int | None = None) -> None: 
+        # the seed makes the plant grow the same way every time, so its growth can be cached
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        self.rules = self.get_length_rule(length) | growth_rules
+        self.axiom = axiom
 
         self.draw_settings = draw_settings
 
         self.length = length
 
+        self.seed = seed
+
         self.regrow()
 
 
+    def __repr__(self) -> str:
+        return self.state
+
+
     def regrow(self) -> None:
-        self.reset()
-        self.step(4)
+        # growth is fixed by the seed, so calling this again gives the same plant rather than a new random growth
+        self.state = get_expanded_state(freeze_rules(self.rules), self.axiom, 4, self.seed)
 
         self.update_draw_settings(self.draw_settings)
 
@@ -188,53 +205,125 @@ class Plant(LSystem):
 
 
     def update_draw_settings(self, draw_settings: DrawSettings) -> None:
-        self.render_funcs: list[Callable[[pygame.Surface, Camera], None]] = []
+        self.draw_settings = draw_settings
+
+        # every symbol adds at most one trunk or leaf, and each trunk adds at most two points
+        size = len(self.state)
+
+        # trunks are merged into polylines, polyline i being trunk_points[trunk_offsets[i]:trunk_offsets[i + 1]]
+        trunk_points = np.empty((size * 2, 2))
+        trunk_offsets = np.zeros(size + 1, int)
+        trunk_colors = np.empty((size, 3), np.uint8)
+        trunk_count = 0
+        point_count = 0
+
+        # whether the last polyline ends at the current position, and its color
+        connected = False
+        last_color = None
+
+        leaf_centers = np.empty((size, 2))
+        leaf_angles = np.empty(size)
+        leaf_colors = np.empty((size, 3), np.uint8)
+        leaf_count = 0
 
         # instantiate state variables
         pos = (0.0, 0.0)
-        angle = 90.0
-        queue: LifoQueue[tuple[vec2, float]] = LifoQueue()
+        turns = 0
+        queue: list[tuple[vec2, int]] = []
 
-        f = 0
+        # the heading is always a whole number of turns from straight up, so each direction is only computed once
+        directions: dict[int, vec2] = {}
 
-        self.state += ' '
-
-        # generate draw functions
-        for i in range(len(self.state) - 1):
-            match self.state[i]:
+        # generate draw batches
+        for token in _DRAW_TOKENS.findall(self.state):
+            match token[0]:
                 case 'F' | 'f': # move foward
-                    f += 1
+                    direction = directions.get(turns)
+
+                    if direction is None:
+                        direction = directions[turns] = angle_vector(90 + turns * draw_settings.angle)
+
+                    length = len(token) * draw_settings.trunk_segment_length
+                    new_pos = (pos[0] + direction[0] * length, pos[1] + direction[1] * length)
+
+                    color = draw_settings.trunk_color_generator()
+
+                    # start a new polyline unless the last one can be extended
+                    if not connected or color != last_color:
+                        trunk_points[point_count] = pos
+                        point_count += 1
 
-                    if self.state[i + 1] not in 'Ff':
-                        new_pos = tuple(pos + angle_vector(angle) * (f * draw_settings.trunk_segment_length))
+                        trunk_colors[trunk_count] = color
+                        trunk_count += 1
 
-                        self.render_funcs.insert(0, partial(draw_trunk, start=pos, end=new_pos, width=int(draw_settings.trunk_width), color=draw_settings.trunk_color_generator()))
+                        connected = True
+                        last_color = color
 
-                        pos = new_pos
+                    trunk_points[point_count] = new_pos
+                    point_count += 1
 
-                        f = 0
+                    trunk_offsets[trunk_count] = point_count
+
+                    pos = new_pos
 
                 case 'X' | 'x': # draw leaf
-                    self.render_funcs.append(partial(draw_leaf, leaf_type=draw_settings.leaf_type, center=pos, angle=angle, rad=draw_settings.leaf_radius, color=draw_settings.leaf_color_generator()))
+                    leaf_centers[leaf_count] = pos
+                    leaf_angles[leaf_count] = 90 + turns * draw_settings.angle
+                    leaf_colors[leaf_count] = draw_settings.leaf_color_generator()
+                    leaf_count += 1
 
                 case '+': # turn left
-                    angle += draw_settings.angle
+                    turns += len(token)
 
                 case '-': # turn right
-                    angle -= draw_settings.angle
+                    turns -= len(token)
 
                 case '[': # save state
-                    queue.put((pos, angle))
+                    queue.append((pos, turns))
 
                 case ']': # restore state
-                    pos, angle = queue.get()
+                    pos, turns = queue.pop()
+
+                    connected = False
 
-        self.state = self.state[:-1]
+        self.trunk_points = trunk_points[:point_count]
+        self.trunk_offsets = trunk_offsets[:trunk_count + 1]
+        self.trunk_widths = np.full(trunk_count, int(draw_settings.trunk_width))
+        self.trunk_colors = trunk_colors[:trunk_count]
+
+        self.leaf_centers = leaf_centers[:leaf_count]
+        self.leaf_angles = leaf_angles[:leaf_count]
+        self.leaf_colors = leaf_colors[:leaf_count]
 
 
     def render(self, surface: pygame.Surface, camera: Camera) -> None:
-        for render_func in self.render_funcs:
-            render_func(surface, camera)
+        self._draw(surface, camera)
+
+
+    def _draw(self, surface: pygame.Surface, camera: Camera) -> None:
+        points = camera.transform_batch(self.trunk_points).tolist()
+        offsets = self.trunk_offsets.tolist()
+        widths = self.trunk_widths.tolist()
+        colors = self.trunk_colors.tolist()
+
+        centers = camera.transform_batch(self.leaf_centers).tolist()
+
+        zoom = camera.view[1]
+        leaf_type = self.draw_settings.leaf_type
+        leaf_radius = self.draw_settings.leaf_radius
+
+        # lock once for the whole batch instead of once per draw call
+        surface.lock()
+
+        try:
+            # trunks are drawn in reverse so that earlier segments sit on top
+            for i in reversed(range(len(widths))):
+                pygame.draw.lines(surface, colors[i], False, points[offsets[i]:offsets[i + 1]], widths[i])
+
+            for center, angle, color in zip(centers, self.leaf_angles.tolist(), self.leaf_colors.tolist()):
+                draw_leaf(surface, leaf_type, center, angle, leaf_radius, zoom, color)
+        finally:
+            surface.unlock()
 
 
     @staticmethod
@@ -302,18 +391,21 @@ class Plant(LSystem):
 
 
 
-@lru_cache
-def angle_vector(angle: float) -> np.ndarray[float, Any]:
-    radians = np.radians(angle)
-    return np.array((np.cos(radians), -np.sin(radians)), float)
+@lru_cache(maxsize=4096)
+def angle_vector(angle: float) -> vec2:
+    angle = radians(angle)
+    return (cos(angle), -sin(angle))
 
 
-def get_mutated_branch(branch: str) -> str:
-    weights = [4, 4, 4, 4, 3, 3, 2, 3, 3, 2]
+_MUTATION_WEIGHTS = (4, 4, 4, 4, 3, 3, 2, 3, 3, 2)
+_CHAR_BITS = {char: 2 ** i for i, char in enumerate('FfXx[]+-')}
 
-    # restrict mutation options to prevent errors
-    chars = sum([(char in branch) * 2 ** i for i, char in enumerate('FfXx[]+-')])
 
+@lru_cache(maxsize=512)
+def get_mutation_cdf(chars: int, has_many_x: bool) -> tuple[tuple[int, ...], int]:
+    weights = list(_MUTATION_WEIGHTS)
+
+    # restrict mutation options to prevent errors
     if not chars & 0b11000000:
         weights[0] = 0
         weights[1] = 0
@@ -331,12 +423,24 @@ def get_mutated_branch(branch: str) -> str:
     if not chars & 0b00010000:
         weights[8] = 0
 
-    if branch.count('X') > 4:
+    if has_many_x:
         weights[5] = 0
         weights[7] = 0
 
+    cum_weights = tuple(accumulate(weights))
+
+    return cum_weights, cum_weights[-1]
+
+
+def get_mutated_branch(branch: str) -> str:
+    chars = 0
+
+    for char in set(branch):
+        chars |= _CHAR_BITS.get(char, 0)
+
     # select a mutation and get the mutated branch
-    mutation = random.choices(range(len(weights)), weights)[0]
+    cum_weights, total = get_mutation_cdf(chars, branch.count('X') > 4)
+    mutation = bisect(cum_weights, random.random() * total)
 
     match mutation:
         case 0: # add rotation
@@ -389,25 +493,19 @@ def get_random_index(obj: str | list) -> int:
 
 
 def get_random_character_index(string: str, characters: str) -> int:
-    for i in random.sample(range(len(string)), len(string)):
-        if string[i] in characters:
-            return i
+    indexes = [i for i, char in enumerate(string) if char in characters]
 
-    return -1
+    return random.choice(indexes) if indexes else -1
 
 
 def get_bracket_indexes(string: str) -> tuple[int, int]:
-    start_index = get_random_character_index(string, '[')
-    index = start_index
-
-    while True:
-        if string[index] == '[':
-            start_index = index
+    index = get_random_character_index(string, '[')
 
-        if string[index] == ']':
-            return start_index, index
+    # the innermost branch at or after the chosen bracket
+    end_index = string.index(']', index)
+    start_index = string.rindex('[', index, end_index)
 
-        index += 1
+    return start_index, end_index
 
 
 def get_characters_in_string(character_set: str, string: str) -> str:
@@ -431,20 +529,18 @@ def get_random_branch() -> str:
     return branch
 
 
-def draw_trunk(surface: pygame.Surface, camera: Camera, start: vec2, end: vec2, width: int, color: Color) -> None:
-    pygame.draw.line(surface, color, camera.transform(start), camera.transform(end), width)
-
-
-def draw_leaf(surface: pygame.Surface, camera: Camera, leaf_type: int, center: vec2, angle: float, rad: float, color: Color) -> None:
+def draw_leaf(surface: pygame.Surface, leaf_type: int, center: vec2, angle: float, rad: float, zoom: float, color: Color) -> None:
+    # center is already in screen space, so offsets from it only need scaling by the zoom
     match leaf_type:
         case 0:
-            pygame.draw.circle(surface, color, camera.transform(center), rad)
+            pygame.draw.circle(surface, color, center, rad)
         case 1:
             for off in (-30, 0, 30):
-                direction = angle_vector(angle + off) * rad
-                pygame.draw.line(surface, color, camera.transform(tuple(center - direction)), camera.transform(tuple(center + direction * 3)), 1)
+                direction = angle_vector(angle + off)
+                dx, dy = direction[0] * rad * zoom, direction[1] * rad * zoom
+                pygame.draw.line(surface, color, (center[0] - dx, center[1] - dy), (center[0] + dx * 3, center[1] + dy * 3), 1)
         case 2:
-            direction = angle_vector(angle) * rad * 2
-            right = (-direction[1], direction[0])
-            pygame.draw.line(surface, color, camera.transform((center[0] + right[0], center[1] + right[1])), camera.transform((center[0] - right[0], center[1] - right[1])), int(rad))
+            direction = angle_vector(angle)
+            right = (-direction[1] * rad * 2 * zoom, direction[0] * rad * 2 * zoom)
+            pygame.draw.line(surface, color, (center[0] + right[0], center[1] + right[1]), (center[0] - right[0], center[1] - right[1]), int(rad))
 
@@ -1,20 +1,29 @@
 import pygame
 
 from typing import Callable
+from functools import lru_cache
 from event import EventManager
-from plant import Plant
+from plant import Plant, DrawSettings
 from camera import Camera
+from l_system import RulesKey, freeze_rules
 
 
 
 class Element:
-    __slots__ = ('manager', '_listener_ids')
+    __slots__ = ('manager', 'dirty', '_listener_ids')
 
     def __init__(self, manager: 'UIManager') -> None:
         self.manager = manager
 
+        # whether the element needs to be drawn again
+        self.dirty = True
+
         self._listener_ids = []
 
+    @property
+    def bounding_rect(self) -> pygame.Rect:
+        return pygame.Rect(0, 0, 0, 0)
+
     def listen(self, event_type: int, function: Callable[[pygame.Event], None]) -> None:
         self._listener_ids.append(self.manager.event_manager.add_listener(event_type, function))
 
@@ -31,17 +40,27 @@ class Text(Element):
     def __init__(self, manager: 'UIManager', text: str, size: int, bold: bool, color: tuple[int, int, int], center: tuple[int, int]) -> None:
         super().__init__(manager)
 
-        renderer = pygame.font.SysFont('Segoe UI', size, bold)
+        renderer = _get_font(size, bold)
 
-        self.text = renderer.render(text, True, color)
+        self.text = renderer.render(text, True, color).convert_alpha()
 
         self.rect = self.text.get_rect(center=center)
 
+    @property
+    def bounding_rect(self) -> pygame.Rect:
+        return self.rect
+
     def render(self, screen: pygame.Surface) -> None:
         screen.blit(self.text, self.rect)
 
 
 
+@lru_cache
+def _get_font(size: int, bold: bool) -> pygame.font.Font:
+    return pygame.font.SysFont('Segoe UI', size, bold)
+
+
+
 class Interactable(Element):
     __slots__ = ('bounding_box', 'hovered', 'pressed')
 
@@ -53,6 +72,10 @@ class Interactable(Element):
         self.hovered = False
         self.pressed = False
 
+    @property
+    def bounding_rect(self) -> pygame.Rect:
+        return self.bounding_box
+
     def render(self, screen: pygame.Surface) -> None:
         if self.pressed:
             pygame.draw.rect(screen, (80, 80, 80), self.bounding_box)
@@ -62,15 +85,21 @@ class Interactable(Element):
             pygame.draw.rect(screen, (150, 150, 150), self.bounding_box)
 
     def _hover(self, event: pygame.Event) -> None:
-        self.hovered = self.bounding_box.collidepoint(event.pos)
+        hovered = self.bounding_box.collidepoint(event.pos)
+
+        if hovered != self.hovered:
+            self.hovered = hovered
+            self.dirty = True
 
     def _press(self, event: pygame.Event) -> None:
         if event.button == pygame.BUTTON_LEFT and self.hovered:
             self.pressed = True
+            self.dirty = True
 
     def _release(self, event: pygame.Event) -> None:
         if self.pressed and event.button == pygame.BUTTON_LEFT:
             self.pressed = False
+            self.dirty = True
 
 
 
@@ -85,6 +114,7 @@ class Button(Interactable):
         def release(event: pygame.Event) -> None:
             if self.pressed and event.button == pygame.BUTTON_LEFT:
                 self.pressed = False
+                self.dirty = True
 
                 if self.hovered:
                     self.function()
@@ -119,14 +149,10 @@ class MutationOption(Button):
         self.surface.fill(1)
         self.surface.set_colorkey(1)
 
-        camera = Camera((self.IMAGE_W * 0.5, self.IMAGE_H - 10))
-
-        for offset in self.OFFSETS:
-            surf = pygame.Surface((self.IMAGE_W, self.IMAGE_H))
-            surf.fill(0)
+        rules_key = freeze_rules(plant.rules)
 
-            plant.regrow()
-            plant.render(surf, camera)
+        for i, offset in enumerate(self.OFFSETS):
+            surf = _render_plant_surface(rules_key, plant.axiom, plant.draw_settings, plant.length, plant.seed + i)
 
             self.surface.blit(surf, offset)
 
@@ -136,6 +162,20 @@ class MutationOption(Button):
         screen.blit(self.surface, self.bounding_box)
 
 
+@lru_cache(maxsize=256)
+def _render_plant_surface(rules_key: RulesKey, axiom: str, draw_settings: DrawSettings, length: float, seed: int) -> pygame.Surface:
+    surf = pygame.Surface((MutationOption.IMAGE_W, MutationOption.IMAGE_H))
+    surf.fill(0)
+
+    plant = Plant(dict(rules_key), axiom, draw_settings, length, seed)
+    plant.render(surf, _THUMBNAIL_CAMERA)
+
+    return surf.convert()
+
+
+_THUMBNAIL_CAMERA = Camera((MutationOption.IMAGE_W * 0.5, MutationOption.IMAGE_H - 10))
+
+
 
 class MutationWindow(Element):
     __slots__ = ('options')
@@ -174,6 +214,13 @@ class MutationWindow(Element):
 
         self.manager.add_elements(*self.options)
 
+    @property
+    def bounding_rect(self) -> pygame.Rect:
+        if not self.options:
+            return super().bounding_rect
+
+        return self.options[0].bounding_box.unionall([option.bounding_box for option in self.options])
+
     def render(self, screen: pygame.Surface) -> None:
         for option in self.options:
             option.render(screen)
@@ -181,16 +228,49 @@ class MutationWindow(Element):
 
 
 class UIManager:
-    __slots__ = ('event_manager', 'ui_elements')
+    __slots__ = ('event_manager', 'ui_elements', 'background', '_dirty_rects', '_full_redraw')
 
-    def __init__(self, event_manager: EventManager) -> None:
+    def __init__(self, event_manager: EventManager, background: tuple[int, int, int]) -> None:
         self.event_manager = event_manager
 
         self.ui_elements: list[Element] = []
 
-    def render(self, screen: pygame.Surface) -> None:
+        self.background = background
+
+        # areas left behind by removed elements
+        self._dirty_rects: list[pygame.Rect] = []
+
+        # the whole screen is redrawn on the first frame and whenever the window has to be repainted
+        self._full_redraw = True
+
+        event_manager.add_listener(pygame.WINDOWEXPOSED, self._redraw_all)
+        event_manager.add_listener(pygame.WINDOWRESTORED, self._redraw_all)
+
+    def render(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        dirty_rects = self._dirty_rects
+        self._dirty_rects = []
+
         for element in self.ui_elements:
-            element.render(screen)
+            if element.dirty:
+                element.dirty = False
+                dirty_rects.append(element.bounding_rect)
+
+        if self._full_redraw:
+            self._full_redraw = False
+            dirty_rects = [screen.get_rect()]
+
+        # redraw the background and every element overlapping each dirty area
+        for rect in dirty_rects:
+            screen.set_clip(rect)
+            screen.fill(self.background)
+
+            for element in self.ui_elements:
+                if element.bounding_rect.colliderect(rect):
+                    element.render(screen)
+
+        screen.set_clip(None)
+
+        return dirty_rects
 
     def add_elements(self, *elements: Element) -> None:
         self.ui_elements.extend(elements)
@@ -199,4 +279,7 @@ class UIManager:
         for element in elements:
             element.remove()
             self.ui_elements.remove(element)
+            self._dirty_rects.append(element.bounding_rect)
 
+    def _redraw_all(self, event: pygame.Event) -> None:
+        self._full_redraw = True